@@ -6,89 +6,53 @@ Tests the WebSocket audio streaming functionality.
 
 import asyncio
 import websockets
-import json
 import base64
 import logging
-import requests
-import time
+from tester_base import BaseTester, dumps_text, loads, run_main, unix_time
+
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data):
+        return base64.b64encode(data).decode()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+logging.basicConfig(level=logging.INFO, format='%(message)s', force=True)
 logger = logging.getLogger(__name__)
 
-class ExtensionTester:
-    def __init__(self):
-        self.websocket_url = "ws://localhost:5000/audio"
-        self.backend_url = "http://localhost:5000/api"
-        self.test_user_id = "extension-test-user"
-        
-    async def test_websocket_connection(self):
-        """Test WebSocket connection to backend"""
-        logger.info("🧪 Testing WebSocket connection...")
-        
-        try:
-            async with websockets.connect(self.websocket_url) as websocket:
-                logger.info("✅ WebSocket connected successfully")
-                
-                # Test connection message
-                test_message = {
-                    "type": "test_connection",
-                    "userId": self.test_user_id,
-                    "timestamp": int(time.time())
-                }
-                
-                await websocket.send(json.dumps(test_message))
-                logger.info("📤 Sent test message")
-                
-                # Wait for response
-                try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                    logger.info(f"📥 Received response: {response}")
-                    return True
-                except asyncio.TimeoutError:
-                    logger.warning("⚠️ No response received (timeout)")
-                    return True  # Connection successful even without response
-                    
-        except Exception as e:
-            logger.error(f"❌ WebSocket connection failed: {e}")
-            return False
-    
-    def test_backend_health(self):
-        """Test backend health endpoint"""
-        logger.info("🧪 Testing backend health...")
+# Constant fake audio payload, encoded once at import
+_FAKE_AUDIO_B64 = b64encode_as_string(b"fake audio data")
+
+class ExtensionTester(BaseTester):
+    def __init__(self, websocket_compression=None):
+        super().__init__("extension-test-user", websocket_compression)
+        self.websocket_reply_timeout = 5
         
-        try:
-            response = requests.get(f"{self.backend_url}/health", timeout=5)
-            
-            if response.status_code == 200:
-                logger.info("✅ Backend health check passed")
-                logger.info(f"   Response: {response.json()}")
-                return True
-            else:
-                logger.error(f"❌ Backend health check failed: {response.status_code}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Backend health check failed: {e}")
-            return False
+        # Formatted with (meeting_id, timestamp) and (timestamp)
+        user_id = dumps_text(self.test_user_id)
+        audio_data = dumps_text(f"data:audio/webm;base64,{_FAKE_AUDIO_B64}")
+        self._audio_chunk_tmpl = (
+            '{"type":"audio_chunk","userId":%s,"meetingId":%%s,"data":%s,"timestamp":%%d}'
+            % (user_id, audio_data)
+        )
+        self._recording_stopped_tmpl = '{"type":"recording_stopped","userId":%s,"timestamp":%%d}' % user_id
     
-    def test_audio_endpoint(self):
+    async def test_audio_endpoint(self):
         """Test audio WebSocket endpoint"""
         logger.info("🧪 Testing audio endpoint...")
         
         try:
-            response = requests.get(f"{self.backend_url}/audio/websocket", timeout=5)
-            
-            if response.status_code == 200:
-                logger.info("✅ Audio endpoint accessible")
-                logger.info(f"   Response: {response.json()}")
-                return True
-            else:
-                logger.error(f"❌ Audio endpoint failed: {response.status_code}")
-                return False
+            async with self.get_http_session().get(f"{self.backend_url}/api/audio/websocket") as response:
+                if response.status == 200:
+                    logger.info("✅ Audio endpoint accessible")
+                    logger.info("   Response: %s", await response.json())
+                    return True
+                else:
+                    logger.error("❌ Audio endpoint failed: %d", response.status)
+                    return False
                 
         except Exception as e:
-            logger.error(f"❌ Audio endpoint test failed: {e}")
+            logger.error("❌ Audio endpoint test failed: %s", e)
             return False
     
     async def test_audio_streaming(self):
@@ -96,61 +60,45 @@ class ExtensionTester:
         logger.info("🧪 Testing audio streaming...")
         
         try:
-            async with websockets.connect(self.websocket_url) as websocket:
-                # Simulate recording start
-                start_message = {
-                    "type": "recording_started",
-                    "userId": self.test_user_id,
-                    "timestamp": int(time.time())
-                }
-                
-                await websocket.send(json.dumps(start_message))
-                logger.info("📤 Sent recording start message")
+            websocket = await self.get_websocket()
+            now = unix_time()
+            
+            # Simulate recording start
+            await websocket.send(self._recording_started_tmpl % now)
+            logger.info("📤 Sent recording start message")
+            
+            # Wait for meeting creation response
+            try:
+                async with asyncio.timeout(10):
+                    response = await websocket.recv()
+                response_data = loads(response)
+                logger.info("📥 Received: %s", response_data)
                 
-                # Wait for meeting creation response
-                try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=10.0)
-                    response_data = json.loads(response)
-                    logger.info(f"📥 Received: {response_data}")
+                if response_data.get('type') == 'meeting_created':
+                    logger.info("✅ Meeting created successfully")
+                    meeting_id = response_data.get('meetingId')
+                    
+                    # Simulate audio chunk
+                    await websocket.send(self._audio_chunk_tmpl % (dumps_text(meeting_id), now))
+                    logger.info("📤 Sent fake audio chunk")
+                    
+                    # Simulate recording stop
+                    await websocket.send(self._recording_stopped_tmpl % now)
+                    logger.info("📤 Sent recording stop message")
                     
-                    if response_data.get('type') == 'meeting_created':
-                        logger.info("✅ Meeting created successfully")
-                        meeting_id = response_data.get('meetingId')
-                        
-                        # Simulate audio chunk
-                        fake_audio_data = base64.b64encode(b"fake audio data").decode()
-                        audio_message = {
-                            "type": "audio_chunk",
-                            "userId": self.test_user_id,
-                            "meetingId": meeting_id,
-                            "data": f"data:audio/webm;base64,{fake_audio_data}",
-                            "timestamp": int(time.time())
-                        }
-                        
-                        await websocket.send(json.dumps(audio_message))
-                        logger.info("📤 Sent fake audio chunk")
-                        
-                        # Simulate recording stop
-                        stop_message = {
-                            "type": "recording_stopped",
-                            "userId": self.test_user_id,
-                            "timestamp": int(time.time())
-                        }
-                        
-                        await websocket.send(json.dumps(stop_message))
-                        logger.info("📤 Sent recording stop message")
-                        
-                        return True
-                    else:
-                        logger.error("❌ Unexpected response type")
-                        return False
-                        
-                except asyncio.TimeoutError:
-                    logger.warning("⚠️ No response received (timeout)")
                     return True
+                else:
+                    logger.error("❌ Unexpected response type")
+                    return False
                     
+            except TimeoutError:
+                logger.warning("⚠️ No response received (timeout)")
+                return True
+                
+        except websockets.ConnectionClosed:
+            raise
         except Exception as e:
-            logger.error(f"❌ Audio streaming test failed: {e}")
+            logger.error("❌ Audio streaming test failed: %s", e)
             return False
     
     async def run_all_tests(self):
@@ -158,44 +106,27 @@ class ExtensionTester:
         logger.info("🎯 Extension Backend Integration Test")
         logger.info("=" * 50)
         
-        tests = [
+        independent = [
             ("Backend Health", self.test_backend_health),
             ("Audio Endpoint", self.test_audio_endpoint),
-            ("WebSocket Connection", self.test_websocket_connection),
-            ("Audio Streaming", self.test_audio_streaming)
+            ("WebSocket Connection", self.test_websocket_connection)
         ]
         
-        passed = 0
-        total = len(tests)
-        
-        for test_name, test_func in tests:
-            logger.info(f"\n📋 Running {test_name}...")
-            try:
-                if asyncio.iscoroutinefunction(test_func):
-                    result = await test_func()
-                else:
-                    result = test_func()
-                
-                if result:
-                    passed += 1
-                    logger.info(f"✅ {test_name} passed!")
-                else:
-                    logger.error(f"❌ {test_name} failed!")
-            except Exception as e:
-                logger.error(f"❌ {test_name} failed with error: {e}")
-        
-        logger.info(f"\n🎯 Test Results: {passed}/{total} tests passed")
+        # Tests that use the shared WebSocket run in order
+        dependent = [
+            ("Audio Streaming", self.test_audio_streaming)
+        ]
         
-        if passed == total:
+        if await self._run(independent, dependent):
             logger.info("🎉 All extension tests passed!")
             logger.info("The Chrome extension should work with your backend!")
         else:
             logger.error("❌ Some tests failed. Please check the logs above.")
             logger.info("Make sure your backend is running on localhost:5000")
 
-async def main():
-    tester = ExtensionTester()
+async def main(websocket_compression=None):
+    tester = ExtensionTester(websocket_compression)
     await tester.run_all_tests()
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    run_main(main)
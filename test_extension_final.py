@@ -6,97 +6,143 @@ Tests the extension functionality without requiring full database setup.
 
 import asyncio
 import websockets
-import json
 import logging
-import time
-import requests
+import os
+import struct
+from tester_base import BaseTester, dumps_text, loads, run_main, unix_time
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+logging.basicConfig(level=logging.INFO, format='%(message)s', force=True)
 logger = logging.getLogger(__name__)
 
-class FinalExtensionTester:
-    def __init__(self):
-        self.websocket_url = "ws://localhost:5000/audio"
-        self.backend_url = "http://localhost:5000"
-        self.test_user_id = "final-test-user"
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Length prefix for the header of a binary audio frame
+_HEADER_LEN = struct.Struct(">I").pack
+
+# Audio chunks per audio_batch frame when batching is enabled
+BATCH = 8
+
+# Padding that stands in for real audio data in the fake chunks
+_PAD100 = "x" * 100
+_PAD200 = "x" * 200
+
+class FinalExtensionTester(BaseTester):
+    def __init__(self, websocket_compression=None):
+        super().__init__("final-test-user", websocket_compression)
         self.meeting_id = None
         
-    async def test_backend_health(self):
-        """Test backend health endpoint"""
-        logger.info("🧪 Testing backend health...")
+        # Coalesce audio chunks into audio_batch frames; needs backend support, so off by default
+        self.batch_audio = os.getenv('BATCH_AUDIO_CHUNKS') == '1'
         
-        try:
-            response = requests.get(f"{self.backend_url}/api/health", timeout=5)
-            if response.status_code == 200:
-                logger.info("✅ Backend health check passed")
-                return True
-            else:
-                logger.error(f"❌ Backend health check failed: {response.status_code}")
-                return False
-        except Exception as e:
-            logger.error(f"❌ Backend health check failed: {e}")
-            return False
+        # Send audio chunks as header-framed binary frames instead of JSON text. The backend
+        # reads plain binary frames as raw audio, so this needs backend support and is off by default
+        self.binary_audio = os.getenv('BINARY_AUDIO_FRAMES') == '1'
+        if self.batch_audio and self.binary_audio:
+            raise ValueError("BATCH_AUDIO_CHUNKS and BINARY_AUDIO_FRAMES cannot be combined")
+        if self.binary_audio and msgpack is None:
+            raise ImportError("BINARY_AUDIO_FRAMES requires msgpack (pip install msgpack)")
+        
+        # Seconds between simulated audio chunks; set SIM_CHUNK_INTERVAL=1 for real-time demos
+        self.chunk_interval = float(os.getenv('SIM_CHUNK_INTERVAL', '0.01'))
+        
+    async def send_audio_batch(self, websocket, meeting_id, chunks):
+        """Send buffered audio chunks as a single audio_batch frame"""
+        batch_message = {
+            "type": "audio_batch",
+            "userId": self.test_user_id,
+            "meetingId": meeting_id,
+            "chunks": chunks,
+            "timestamp": unix_time()
+        }
+        
+        await websocket.send(dumps_text(batch_message))
+        logger.info("📤 Sent audio batch of %d chunks", len(chunks))
     
-    async def test_websocket_connection(self):
-        """Test WebSocket connection"""
-        logger.info("🧪 Testing WebSocket connection...")
+    async def stream_audio_chunks(self, websocket, meeting_id, datas, log_chunks=False):
+        """Send fake audio chunks chunk_interval apart, individually or as audio_batch frames"""
+        # One message dict reused for every chunk; only data and timestamp change
+        audio_message = {
+            "type": "audio_chunk",
+            "userId": self.test_user_id,
+            "meetingId": meeting_id
+        }
         
-        try:
-            async with websockets.connect(self.websocket_url) as websocket:
-                logger.info("✅ WebSocket connected successfully")
-                
-                # Send test message
-                test_message = {
-                    "type": "test_connection",
-                    "userId": self.test_user_id,
-                    "timestamp": int(time.time())
-                }
-                
-                await websocket.send(json.dumps(test_message))
-                logger.info("📤 Sent test message")
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"❌ WebSocket connection failed: {e}")
-            return False
+        # Bind globals and attributes used per chunk to locals
+        _send, _dumps, _time, _sleep = websocket.send, dumps_text, unix_time, asyncio.sleep
+        interval = self.chunk_interval
+        batch_audio, binary_audio, _frame = self.batch_audio, self.binary_audio, self.encode_audio_frame
+        log_chunks = log_chunks and logger.isEnabledFor(logging.INFO)
+        pending = []
+        for seq, data in enumerate(datas):
+            if batch_audio:
+                # Buffer chunks as they are captured and flush every BATCH
+                pending.append({"seq": seq, "data": data})
+                if len(pending) == BATCH:
+                    await self.send_audio_batch(websocket, meeting_id, pending)
+                    pending = []
+            else:
+                audio_message["timestamp"] = _time()
+                if binary_audio:
+                    # Audio travels as raw bytes after the header, not inside it
+                    await _send(_frame(audio_message, data.encode()))
+                else:
+                    audio_message["data"] = data
+                    await _send(_dumps(audio_message))
+                if log_chunks:
+                    logger.info("📤 Sent audio chunk %d", seq + 1)
+            await _sleep(interval)
+        
+        if pending:
+            await self.send_audio_batch(websocket, meeting_id, pending)
+    
+    @staticmethod
+    def encode_audio_frame(header, audio):
+        """Build a binary audio frame: 4-byte header length, msgpack header, raw audio bytes"""
+        packed = msgpack.packb(header)
+        return _HEADER_LEN(len(packed)) + packed + audio
     
     async def test_meeting_creation(self):
         """Test meeting creation workflow"""
         logger.info("🧪 Testing meeting creation workflow...")
         
         try:
-            async with websockets.connect(self.websocket_url) as websocket:
-                # Send recording start message
-                start_message = {
-                    "type": "recording_started",
-                    "userId": self.test_user_id,
-                    "timestamp": int(time.time())
-                }
-                
-                await websocket.send(json.dumps(start_message))
-                logger.info("📤 Sent recording start message")
+            websocket = await self.get_websocket()
+            # Send recording start message
+            start_message = {
+                "type": "recording_started",
+                "userId": self.test_user_id,
+                "timestamp": unix_time()
+            }
+            
+            await websocket.send(dumps_text(start_message))
+            logger.info("📤 Sent recording start message")
+            
+            # Wait for meeting creation response
+            try:
+                async with asyncio.timeout(10):
+                    response = await websocket.recv()
+                response_data = loads(response)
                 
-                # Wait for meeting creation response
-                try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=10.0)
-                    response_data = json.loads(response)
-                    
-                    if response_data.get('type') == 'meeting_created':
-                        self.meeting_id = response_data.get('meetingId')
-                        logger.info(f"✅ Meeting created: {self.meeting_id}")
-                        return True
-                    else:
-                        logger.error(f"❌ Unexpected response: {response_data}")
-                        return False
-                        
-                except asyncio.TimeoutError:
-                    logger.error("❌ No response received for meeting creation")
+                if response_data.get('type') == 'meeting_created':
+                    self.meeting_id = response_data.get('meetingId')
+                    logger.info("✅ Meeting created: %s", self.meeting_id)
+                    return True
+                else:
+                    logger.error("❌ Unexpected response: %s", response_data)
                     return False
                     
-        except Exception as e:
-            logger.error(f"❌ Meeting creation test failed: {e}")
+            except TimeoutError:
+                logger.error("❌ No response received for meeting creation")
+                return False
+                
+        except websockets.ConnectionClosed:
+            raise
+        except (websockets.WebSocketException, TimeoutError, OSError) as e:
+            logger.error("❌ Meeting creation test failed: %s", e)
             return False
     
     async def test_audio_streaming(self):
@@ -108,37 +154,33 @@ class FinalExtensionTester:
             return False
         
         try:
-            async with websockets.connect(self.websocket_url) as websocket:
-                # Send multiple audio chunks
-                for i in range(5):
-                    audio_message = {
-                        "type": "audio_chunk",
-                        "userId": self.test_user_id,
-                        "meetingId": self.meeting_id,
-                        "data": f"fake_audio_data_chunk_{i}_" + "x" * 100,  # Simulate real audio data
-                        "timestamp": int(time.time())
-                    }
-                    
-                    await websocket.send(json.dumps(audio_message))
-                    logger.info(f"📤 Sent audio chunk {i+1}")
-                    await asyncio.sleep(0.1)
-                
-                # Send recording stop message
-                stop_message = {
-                    "type": "recording_stopped",
-                    "userId": self.test_user_id,
-                    "meetingId": self.meeting_id,
-                    "timestamp": int(time.time())
-                }
-                
-                await websocket.send(json.dumps(stop_message))
-                logger.info("📤 Sent recording stop message")
-                
-                logger.info("✅ Audio streaming workflow completed")
-                return True
-                
-        except Exception as e:
-            logger.error(f"❌ Audio streaming test failed: {e}")
+            websocket = await self.get_websocket()
+            # Send multiple audio chunks, simulating real audio data
+            await self.stream_audio_chunks(
+                websocket,
+                self.meeting_id,
+                [f"fake_audio_data_chunk_{i}_{_PAD100}" for i in range(5)],
+                log_chunks=True
+            )
+            
+            # Send recording stop message
+            stop_message = {
+                "type": "recording_stopped",
+                "userId": self.test_user_id,
+                "meetingId": self.meeting_id,
+                "timestamp": unix_time()
+            }
+            
+            await websocket.send(dumps_text(stop_message))
+            logger.info("📤 Sent recording stop message")
+            
+            logger.info("✅ Audio streaming workflow completed")
+            return True
+            
+        except websockets.ConnectionClosed:
+            raise
+        except (websockets.WebSocketException, TimeoutError, OSError) as e:
+            logger.error("❌ Audio streaming test failed: %s", e)
             return False
     
     async def test_extension_simulation(self):
@@ -146,7 +188,9 @@ class FinalExtensionTester:
         logger.info("🧪 Testing complete extension simulation...")
         
         try:
-            async with websockets.connect(self.websocket_url) as websocket:
+            # A fresh connection, as a new extension session would open; the shared one
+            # may still hold replies from the earlier meeting's start/stream/stop session
+            async with self.connect_websocket() as websocket:
                 logger.info("✅ WebSocket connected for simulation")
                 
                 # Simulate extension startup
@@ -157,55 +201,54 @@ class FinalExtensionTester:
                 start_message = {
                     "type": "recording_started",
                     "userId": self.test_user_id,
-                    "timestamp": int(time.time())
+                    "timestamp": unix_time()
                 }
                 
-                await websocket.send(json.dumps(start_message))
+                await websocket.send(dumps_text(start_message))
                 logger.info("📤 Recording started")
                 
                 # Wait for meeting creation
                 try:
-                    response = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                    response_data = json.loads(response)
+                    async with asyncio.timeout(5):
+                        response = await websocket.recv()
+                    response_data = loads(response)
                     
                     if response_data.get('type') == 'meeting_created':
                         self.meeting_id = response_data.get('meetingId')
-                        logger.info(f"✅ Meeting created: {self.meeting_id}")
+                        logger.info("✅ Meeting created: %s", self.meeting_id)
                     else:
-                        logger.warning(f"⚠️ Unexpected response: {response_data}")
-                except asyncio.TimeoutError:
+                        logger.warning("⚠️ Unexpected response: %s", response_data)
+                except TimeoutError:
                     logger.warning("⚠️ No meeting creation response")
                 
                 # Simulate recording session
-                logger.info("🎤 Simulating 10-second recording session...")
-                for i in range(10):
-                    audio_message = {
-                        "type": "audio_chunk",
-                        "userId": self.test_user_id,
-                        "meetingId": self.meeting_id or "simulation-meeting",
-                        "data": f"audio_chunk_{i}_" + "x" * 200,
-                        "timestamp": int(time.time())
-                    }
-                    
-                    await websocket.send(json.dumps(audio_message))
-                    await asyncio.sleep(1)  # 1 second intervals
+                logger.info("🎤 Simulating recording session (10 chunks, %ss apart)...", self.chunk_interval)
+                meeting_id = self.meeting_id or "simulation-meeting"
+                
+                await self.stream_audio_chunks(
+                    websocket,
+                    meeting_id,
+                    [f"audio_chunk_{i}_{_PAD200}" for i in range(10)]
+                )
                 
                 # Send recording stop
                 stop_message = {
                     "type": "recording_stopped",
                     "userId": self.test_user_id,
-                    "meetingId": self.meeting_id or "simulation-meeting",
-                    "timestamp": int(time.time())
+                    "meetingId": meeting_id,
+                    "timestamp": unix_time()
                 }
                 
-                await websocket.send(json.dumps(stop_message))
+                await websocket.send(dumps_text(stop_message))
                 logger.info("📤 Recording stopped")
                 
                 logger.info("✅ Complete extension simulation successful")
                 return True
-                
-        except Exception as e:
-            logger.error(f"❌ Extension simulation failed: {e}")
+            
+        except websockets.ConnectionClosed:
+            raise
+        except (websockets.WebSocketException, TimeoutError, OSError) as e:
+            logger.error("❌ Extension simulation failed: %s", e)
             return False
     
     async def run_final_test(self):
@@ -213,32 +256,21 @@ class FinalExtensionTester:
         logger.info("🎯 Final Extension Test")
         logger.info("=" * 40)
         
-        tests = [
+        independent = [
             ("Backend Health", self.test_backend_health),
-            ("WebSocket Connection", self.test_websocket_connection),
+            ("WebSocket Connection", self.test_websocket_connection)
+        ]
+        
+        # These share self.meeting_id and the WebSocket, so they run in order
+        dependent = [
             ("Meeting Creation", self.test_meeting_creation),
             ("Audio Streaming", self.test_audio_streaming),
             ("Extension Simulation", self.test_extension_simulation)
         ]
         
-        passed = 0
-        total = len(tests)
-        
-        for test_name, test_func in tests:
-            logger.info(f"\n📋 Running {test_name}...")
-            try:
-                result = await test_func()
-                if result:
-                    passed += 1
-                    logger.info(f"✅ {test_name} passed!")
-                else:
-                    logger.error(f"❌ {test_name} failed!")
-            except Exception as e:
-                logger.error(f"❌ {test_name} failed with error: {e}")
-        
-        logger.info(f"\n🎯 Test Results: {passed}/{total} tests passed")
+        success = await self._run(independent, dependent)
         
-        if passed == total:
+        if success:
             logger.info("🎉 All extension tests passed!")
             logger.info("Your AI Meeting Assistant extension is ready to use!")
             logger.info("\n🚀 Next Steps:")
@@ -250,10 +282,10 @@ class FinalExtensionTester:
             logger.error("❌ Some tests failed. Please check the logs above.")
             logger.info("Make sure your backend is running on localhost:5000")
         
-        return passed == total
+        return success
 
-async def main():
-    tester = FinalExtensionTester()
+async def main(websocket_compression=None):
+    tester = FinalExtensionTester(websocket_compression)
     success = await tester.run_final_test()
     
     if success:
@@ -262,4 +294,4 @@ async def main():
         logger.error("\n❌ Please fix the failing tests before using the extension.")
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    run_main(main)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Shared Tester Base
+Connection handling, common checks and the test runner used by the extension testers.
+"""
+
+import argparse
+import asyncio
+import websockets
+import json
+import logging
+import aiohttp
+import time
+
+try:
+    from orjson import dumps, loads
+except ImportError:
+    # Fall back to stdlib json, keeping orjson's bytes-returning dumps()
+    def dumps(obj):
+        return json.dumps(obj).encode()
+    
+    loads = json.loads
+
+def dumps_text(obj):
+    """Serialize obj to a str, so websocket.send() uses a text frame"""
+    # The backend treats binary frames as raw audio, so JSON must go out as text
+    return dumps(obj).decode()
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+def unix_time():
+    """Current Unix time in whole seconds, without a float round trip"""
+    return time.time_ns() // 1_000_000_000
+
+class BaseTester:
+    def __init__(self, test_user_id, websocket_compression=None):
+        # IP literals skip the localhost name lookup (and IPv6 fallback) on every connect
+        self.websocket_url = "ws://127.0.0.1:5000/audio"
+        self.backend_url = "http://127.0.0.1:5000"
+        self.test_user_id = test_user_id
+        
+        # permessage-deflate setting for new WebSockets; "deflate" when run with --compression
+        self.websocket_compression = websocket_compression
+        self.ws = None
+        self.http = None
+        
+        # Seconds to wait for a reply to the connection test message, or None to skip
+        self.websocket_reply_timeout = None
+        
+        # Pre-serialized messages; only the fields that vary per send are formatted in
+        user_id = dumps_text(self.test_user_id)
+        self._test_connection_tmpl = '{"type":"test_connection","userId":%s,"timestamp":%%d}' % user_id
+        self._recording_started_tmpl = '{"type":"recording_started","userId":%s,"timestamp":%%d}' % user_id
+    
+    def connect_websocket(self):
+        """Open a WebSocket to the backend tuned for short local test sessions"""
+        # Small JSON messages over loopback gain nothing from permessage-deflate,
+        # and keepalive pings are unnecessary for a run that lasts seconds.
+        # A larger write buffer keeps back-to-back sends from waiting on drain.
+        return websockets.connect(
+            self.websocket_url,
+            compression=self.websocket_compression,
+            max_size=None,
+            ping_interval=None,
+            write_limit=2**20,
+            max_queue=128
+        )
+    
+    async def get_websocket(self):
+        """Get the shared WebSocket connection, connecting on first use"""
+        if self.ws is None:
+            self.ws = await self.connect_websocket()
+        return self.ws
+    
+    def get_http_session(self):
+        """Get the shared HTTP session, creating it on first use"""
+        if self.http is None:
+            self.http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        return self.http
+    
+    async def close_websocket(self):
+        """Close the shared WebSocket connection"""
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+    
+    async def close_http_session(self):
+        """Close the shared HTTP session"""
+        if self.http is not None:
+            await self.http.close()
+            self.http = None
+    
+    async def setup(self):
+        """Open resources shared by the tests before a run"""
+    
+    async def teardown(self):
+        """Close resources shared by the tests after a run"""
+        await self.close_websocket()
+        await self.close_http_session()
+    
+    async def __aenter__(self):
+        await self.setup()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.teardown()
+    
+    async def test_backend_health(self):
+        """Test backend health endpoint"""
+        logger.info("🧪 Testing backend health...")
+        
+        try:
+            async with self.get_http_session().get(f"{self.backend_url}/api/health") as response:
+                if response.status == 200:
+                    logger.info("✅ Backend health check passed")
+                    logger.info("   Response: %s", await response.text())
+                    return True
+                else:
+                    logger.error("❌ Backend health check failed: %d", response.status)
+                    return False
+        
+        except Exception as e:
+            logger.error("❌ Backend health check failed: %s", e)
+            return False
+    
+    async def test_websocket_connection(self):
+        """Test WebSocket connection to backend"""
+        logger.info("🧪 Testing WebSocket connection...")
+        
+        try:
+            async with self.connect_websocket() as websocket:
+                logger.info("✅ WebSocket connected successfully")
+                
+                # Send test message
+                await websocket.send(self._test_connection_tmpl % unix_time())
+                logger.info("📤 Sent test message")
+                
+                if self.websocket_reply_timeout is None:
+                    return True
+                
+                # Wait for response
+                try:
+                    async with asyncio.timeout(self.websocket_reply_timeout):
+                        response = await websocket.recv()
+                    logger.info("📥 Received response: %s", response)
+                    return True
+                except TimeoutError:
+                    logger.warning("⚠️ No response received (timeout)")
+                    return True  # Connection successful even without response
+        
+        except Exception as e:
+            logger.error("❌ WebSocket connection failed: %s", e)
+            return False
+    
+    async def run_with_reconnect(self, test_func):
+        """Run a test, reconnecting the shared WebSocket once if it was closed"""
+        try:
+            return await test_func()
+        except websockets.ConnectionClosed:
+            logger.warning("⚠️ WebSocket connection closed, reconnecting...")
+            self.ws = None
+            return await test_func()
+    
+    def record_result(self, test_name, result):
+        """Log the outcome of a test and return whether it passed"""
+        if isinstance(result, BaseException):
+            logger.error("❌ %s failed with error: %s", test_name, result)
+            return False
+        if result:
+            logger.info("✅ %s passed!", test_name)
+            return True
+        logger.error("❌ %s failed!", test_name)
+        return False
+    
+    async def _run(self, independent, dependent):
+        """Run independent tests concurrently, then dependent tests in order"""
+        logger.info("Event loop: %s", type(asyncio.get_running_loop()).__name__)
+        
+        passed = 0
+        total = len(independent) + len(dependent)
+        
+        async with self:
+            if independent:
+                logger.info("\n📋 Running %s...", ', '.join(name for name, _ in independent))
+                
+                # Independent tests must not touch the shared WebSocket
+                results = await asyncio.gather(
+                    *(test_func() for _, test_func in independent),
+                    return_exceptions=True
+                )
+                for (test_name, _), result in zip(independent, results):
+                    if self.record_result(test_name, result):
+                        passed += 1
+            
+            for test_name, test_func in dependent:
+                logger.info("\n📋 Running %s...", test_name)
+                try:
+                    result = await self.run_with_reconnect(test_func)
+                except Exception as e:
+                    result = e
+                if self.record_result(test_name, result):
+                    passed += 1
+        
+        logger.info("\n🎯 Test Results: %d/%d tests passed", passed, total)
+        return passed == total
+
+def run_main(main):
+    """Parse the command line and run a tester's main coroutine, on uvloop when it is installed"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--compression",
+        action="store_true",
+        help="enable WebSocket compression, for remote backends where bandwidth is the constraint"
+    )
+    args = parser.parse_args()
+    websocket_compression = "deflate" if args.compression else None
+    
+    if uvloop is None:
+        asyncio.run(main(websocket_compression))
+    elif hasattr(uvloop, "run"):
+        uvloop.run(main(websocket_compression))
+    else:
+        # uvloop before 0.18 has no run(); install its event loop policy instead
+        uvloop.install()
+        asyncio.run(main(websocket_compression))